@@ -1,27 +1,54 @@
 # app.py
 import os
+
+# Threads de OpenMP/BLAS precisam ser definidas antes de importar numpy/torch
+os.environ.setdefault("OMP_NUM_THREADS", os.getenv("TORCH_THREADS", str(os.cpu_count())))
+
 import re
 import json
+import asyncio
+import ipaddress
 import shutil
+import tempfile
+import functools
+import hashlib
+import sqlite3
+import queue
+import threading
+import time
 import socket
 import whois
 import requests
+import aiohttp
+import aiodns
+import asyncwhois
 import subprocess
+import joblib
 import numpy as np
+import orjson
+import pandas as pd
 import face_recognition
+import dlib
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_file, after_this_request
+from collections import OrderedDict
+from contextlib import closing
+from concurrent.futures import Future
+from urllib.parse import urlencode
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from bs4 import BeautifulSoup
 from io import BytesIO
 from PIL import Image
-import pytesseract
+from tesserocr import PyTessBaseAPI, PSM
 import dns.resolver
 import nmap
 from sklearn.cluster import DBSCAN
-from sklearn.preprocessing import StandardScaler
+from sklearn.neighbors import NearestNeighbors
+from sklearn.metrics import adjusted_rand_score
+from sklearn.decomposition import TruncatedSVD
 import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
+from sentence_transformers import SentenceTransformer
 import openai
 from dotenv import load_dotenv
 
@@ -38,34 +65,539 @@ VIRUSTOTAL_API_KEY = os.getenv('VIRUSTOTAL_API_KEY', 'SUA_CHAVE_VIRUSTOTAL')
 ABUSEIPDB_API_KEY = os.getenv('ABUSEIPDB_API_KEY', 'SUA_CHAVE_ABUSEIPDB')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'SUA_CHAVE_OPENAI')
 
+# Consultas OSINT assíncronas
+OSINT_TIMEOUT = 15
+OSINT_MAX_CONNECTIONS = 100
+OSINT_DNS_CACHE_TTL = 300
+
+# Cache em disco das respostas das APIs OSINT (segundos); os dados do
+# VirusTotal mudam devagar e ficam válidos por mais tempo
+OSINT_CACHE_PATH = os.path.join('cache', 'osint.sqlite')
+OSINT_CACHE_TTL = 3600
+OSINT_VT_CACHE_TTL = 86400
+# Intervalo (segundos) entre remoções das entradas expiradas do cache
+OSINT_CACHE_PRUNE_INTERVAL = 600
+
+# Varredura de portas: masscan (se instalado) descobre as portas abertas e o
+# nmap detecta serviço/versão apenas nos hosts vivos
+MASSCAN_PATH = shutil.which('masscan')
+MASSCAN_RATE = int(os.getenv('MASSCAN_RATE', 10000))
+MAX_SCAN_ADDRESSES = 65536
+DEFAULT_SCAN_PORTS = '1-1024'
+# Tempo máximo (segundos) de uma varredura completa (masscan + nmap)
+PORT_SCAN_TIMEOUT = int(os.getenv('PORT_SCAN_TIMEOUT', 300))
+
 # Configuração OpenAI
-openai.api_key = OPENAI_API_KEY
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 
 # Configurações do sistema
-UPLOAD_FOLDER = 'uploads'
 KNOWN_FACES_FOLDER = 'known_faces'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+HYPOTHESES_CACHE_FOLDER = os.path.join('cache', 'hypotheses')
+HYPOTHESES_CACHE_TTL = int(os.getenv('HYPOTHESES_CACHE_TTL', 86400))
+KNOWN_FACES_CACHE = os.path.join(KNOWN_FACES_FOLDER, '_cache.npz')
+FACE_MATCH_TOLERANCE = 0.6
+
+# Codificações faciais são armazenadas em float16 (metade da memória);
+# a comparação de distâncias é feita em float32
+KNOWN_FACES_DTYPE = np.float16
+# Linhas da galeria convertidas para float32 por vez na comparação
+FACE_MATCH_CHUNK = 4096
+
+# Detecção facial em lote: a CNN do dlib só compensa com build CUDA;
+# em CPU o HOG é mais rápido por imagem (mas não processa em lote)
+FACE_DETECTION_MODEL = "cnn" if dlib.DLIB_USE_CUDA else "hog"
+FACE_BATCH_SIZE = 32
+FACE_BATCH_MAX_FILES = 4 * FACE_BATCH_SIZE
+
+# Imagens maiores que isso (lado maior, em pixels) são reduzidas antes da detecção
+MAX_DETECTION_SIZE = 1280
+
 os.makedirs(KNOWN_FACES_FOLDER, exist_ok=True)
+os.makedirs(HYPOTHESES_CACHE_FOLDER, exist_ok=True)
+
+# Quantização INT8 dos modelos (RASTRO_QUANTIZE=1 para ativar)
+RASTRO_QUANTIZE = os.getenv('RASTRO_QUANTIZE', '0') == '1'
+
+# ONNX Runtime para os modelos de NER e Q&A (RASTRO_ONNX=1 para ativar)
+RASTRO_ONNX = os.getenv('RASTRO_ONNX', '0') == '1'
+ONNX_FOLDER = 'onnx_models'
+
+# Identificadores dos modelos de IA
+# A versão destilada (6 camadas) do BERT português é opcional até a validação
+# de F1 no conjunto de entidades: RASTRO_NER_MODEL=adalbertojunior/distilbert-portuguese-cased
+NER_MODEL = os.getenv('RASTRO_NER_MODEL', "neuralmind/bert-base-portuguese-cased")
+SENTIMENT_MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
+QA_MODEL = os.getenv('RASTRO_QA_MODEL', "pierreguillou/bert-base-cased-squad-v1.1-portuguese")
+EMBEDDING_MODEL = "neuralmind/bert-base-portuguese-cased"
+EMBEDDING_CACHE_SIZE = 10000
+ANALYSIS_CACHE_SIZE = 4096
+MIN_NER_TOKENS = 3
+ENTITY_CLUSTER_EPS = 0.3
+
+# Projeção PCA dos embeddings (768 -> 128 dimensões) antes da clusterização.
+# PCA_MODEL_PATH é gerado fora do servidor, com `python fit_pca.py`, a partir
+# do corpus de bootstrap (uma entidade/texto por linha); sem ele, os
+# embeddings seguem inteiros.
+# A base é ajustada sem centralizar (TruncatedSVD sobre os embeddings
+# normalizados): a direção média, dominante nos embeddings do BERT, fica na
+# projeção, e as distâncias de cosseno após renormalizar acompanham as do
+# espaço completo, de modo que ENTITY_CLUSTER_EPS vale com ou sem projeção.
+PCA_COMPONENTS = 128
+# Ao ajustar, os rótulos da clusterização com e sem projeção são comparados
+# em uma amostra do corpus (índice de Rand ajustado mínimo para gravar)
+PCA_CHECK_SAMPLE = 2000
+PCA_MIN_AGREEMENT = 0.95
+PCA_MODEL_PATH = 'pca.joblib'
+PCA_CORPUS_PATH = os.getenv('RASTRO_PCA_CORPUS', 'pca_corpus.txt')
+
+# OCR: instâncias do Tesseract mantidas em processo e reaproveitadas
+OCR_LANG = 'por'
+# Máximo de instâncias por processo; sob gevent as chamadas de OCR de um worker
+# não se sobrepõem, então uma instância por worker basta
+OCR_POOL_SIZE = int(os.getenv('OCR_POOL_SIZE', 1))
+
+# A latência em CPU é muito sensível ao número de threads
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", os.cpu_count()))
+torch.set_num_threads(TORCH_THREADS)
+torch.set_num_interop_threads(1)
+
+def quantize_model(model):
+    """Aplica quantização dinâmica INT8 nas camadas lineares do modelo"""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def synchronized_cache(loader):
+    """functools.cache protegido por lock.
+
+    Garante que o carregamento roda uma única vez, mesmo com várias
+    requisições chegando juntas no primeiro uso.
+    """
+    cached = functools.cache(loader)
+    lock = threading.Lock()
+    
+    @functools.wraps(loader)
+    def getter():
+        with lock:
+            return cached()
+    return getter
+
+def load_onnx_model(model_class, model_id):
+    """Carrega um modelo no ONNX Runtime com otimização de grafo completa.
+
+    Na primeira execução o modelo é exportado para ONNX_FOLDER (equivalente a
+    `optimum-cli export onnx --model <model_id> <dir>` no build). Com
+    RASTRO_QUANTIZE=1 também é gerada uma versão INT8 dinâmica (AVX512-VNNI).
+    """
+    # Dependências opcionais, importadas só quando RASTRO_ONNX=1
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    
+    # Exportações são gravadas em diretório temporário e renomeadas no final,
+    # para que processos concorrentes nunca vejam um export pela metade
+    os.makedirs(ONNX_FOLDER, exist_ok=True)
+    export_dir = os.path.join(ONNX_FOLDER, model_id.replace('/', '__'))
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        tmp_dir = tempfile.mkdtemp(dir=ONNX_FOLDER)
+        try:
+            model = model_class.from_pretrained(model_id, export=True)
+            model.save_pretrained(tmp_dir)
+            try:
+                os.rename(tmp_dir, export_dir)
+            except OSError:
+                # Outro processo concluiu a exportação primeiro
+                if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    file_name = "model.onnx"
+    if RASTRO_QUANTIZE:
+        file_name = "model_quantized.onnx"
+        if not os.path.exists(os.path.join(export_dir, file_name)):
+            tmp_dir = tempfile.mkdtemp(dir=ONNX_FOLDER)
+            try:
+                quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+                os.replace(os.path.join(tmp_dir, file_name), os.path.join(export_dir, file_name))
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = TORCH_THREADS
+    return model_class.from_pretrained(
+        export_dir,
+        file_name=file_name,
+        provider="CPUExecutionProvider",
+        session_options=session_options
+    )
+
+# Os modelos de IA são carregados sob demanda, no primeiro uso;
+# com GPU disponível rodam em fp16 na CUDA
+USE_CUDA = torch.cuda.is_available()
+MODEL_DEVICE = 0 if USE_CUDA else -1
+MODEL_DTYPE = torch.float16 if USE_CUDA else torch.float32
+
+# Micro-lotes: requisições concorrentes são agrupadas em um único forward
+BATCH_MAX_SIZE = 16
+BATCH_MAX_WAIT = 0.01
+
+@synchronized_cache
+def get_ner():
+    """Carrega o modelo de NER (Reconhecimento de Entidades Nomeadas)"""
+    try:
+        if RASTRO_ONNX:
+            from optimum.onnxruntime import ORTModelForTokenClassification
+            ner_model = load_onnx_model(ORTModelForTokenClassification, NER_MODEL)
+            ner_tokenizer = AutoTokenizer.from_pretrained(NER_MODEL)
+            return pipeline("ner", model=ner_model, tokenizer=ner_tokenizer, aggregation_strategy="simple")
+        
+        nlp_ner = pipeline(
+            "ner",
+            model=NER_MODEL,
+            device=MODEL_DEVICE,
+            torch_dtype=MODEL_DTYPE,
+            aggregation_strategy="simple"
+        )
+        nlp_ner.model.eval()
+        # Quantização INT8 só se aplica à execução em CPU
+        if RASTRO_QUANTIZE and not USE_CUDA:
+            nlp_ner.model = quantize_model(nlp_ner.model)
+        return nlp_ner
+    except Exception as e:
+        print(f"Erro ao carregar modelo de NER: {str(e)}")
+        return None
+
+@synchronized_cache
+def get_sentiment_analyzer():
+    """Carrega o modelo para análise de sentimento em português"""
+    try:
+        sentiment_analyzer = pipeline(
+            "sentiment-analysis",
+            model=SENTIMENT_MODEL,
+            device=MODEL_DEVICE,
+            torch_dtype=MODEL_DTYPE
+        )
+        sentiment_analyzer.model.eval()
+        if RASTRO_QUANTIZE and not USE_CUDA:
+            sentiment_analyzer.model = quantize_model(sentiment_analyzer.model)
+        return sentiment_analyzer
+    except Exception as e:
+        print(f"Erro ao carregar modelo de sentimento: {str(e)}")
+        return None
+
+@synchronized_cache
+def get_qa():
+    """Carrega o modelo para Q&A (Pergunta e Resposta)"""
+    try:
+        qa_tokenizer = AutoTokenizer.from_pretrained(QA_MODEL)
+        if RASTRO_ONNX:
+            from optimum.onnxruntime import ORTModelForQuestionAnswering
+            qa_model = load_onnx_model(ORTModelForQuestionAnswering, QA_MODEL)
+            return pipeline("question-answering", model=qa_model, tokenizer=qa_tokenizer)
+        
+        qa_model = AutoModelForQuestionAnswering.from_pretrained(QA_MODEL, torch_dtype=MODEL_DTYPE).eval()
+        if RASTRO_QUANTIZE and not USE_CUDA:
+            qa_model = quantize_model(qa_model)
+        return pipeline("question-answering", model=qa_model, tokenizer=qa_tokenizer, device=MODEL_DEVICE)
+    except Exception as e:
+        print(f"Erro ao carregar modelo de Q&A: {str(e)}")
+        return None
+
+@synchronized_cache
+def get_openai_client():
+    """Cria o cliente da API OpenAI"""
+    return openai.OpenAI(api_key=OPENAI_API_KEY)
+
+class LRUCache:
+    """Cache LRU simples e thread-safe"""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            self.data.move_to_end(key)
+            return self.data[key]
+    
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            # Descartar as entradas menos usadas recentemente
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+class MicroBatcher:
+    """Agrupa chamadas concorrentes a um pipeline em um único forward em lote.
+
+    Cada lote é processado quando atinge max_batch_size itens ou após
+    max_wait segundos desde o primeiro item, em uma thread de background.
+    """
+    
+    def __init__(self, fn, max_batch_size=BATCH_MAX_SIZE, max_wait=BATCH_MAX_WAIT):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+    
+    def start(self):
+        """Inicia a thread de processamento no primeiro uso"""
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run, daemon=True)
+                self.worker.start()
+    
+    def enqueue(self, items):
+        """Enfileira os itens e retorna um Future para cada um"""
+        self.start()
+        futures = []
+        for item in items:
+            future = Future()
+            self.queue.put((item, future))
+            futures.append(future)
+        return futures
+    
+    def submit(self, item):
+        """Processa um item e aguarda o resultado"""
+        return self.enqueue([item])[0].result()
+    
+    def collect(self):
+        """Aguarda o primeiro item e coleta os demais até o limite de tempo ou tamanho"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def run(self):
+        while True:
+            batch = self.collect()
+            items = [item for item, _ in batch]
+            try:
+                # Sem autograd: nenhum grafo/buffer de gradiente é alocado
+                with torch.inference_mode():
+                    outputs = self.fn(items, batch_size=len(items))
+                # Alguns pipelines (ex.: Q&A) retornam o resultado direto para um único item
+                if not isinstance(outputs, list):
+                    outputs = [outputs]
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+@synchronized_cache
+def get_ner_batcher():
+    """Fila de micro-lotes para o modelo de NER"""
+    nlp_ner = get_ner()
+    return MicroBatcher(nlp_ner) if nlp_ner else None
+
+@synchronized_cache
+def get_sentiment_batcher():
+    """Fila de micro-lotes para o modelo de sentimento"""
+    sentiment_analyzer = get_sentiment_analyzer()
+    return MicroBatcher(sentiment_analyzer) if sentiment_analyzer else None
+
+@synchronized_cache
+def get_qa_batcher():
+    """Fila de micro-lotes para o modelo de Q&A"""
+    qa_pipeline = get_qa()
+    return MicroBatcher(qa_pipeline) if qa_pipeline else None
+
+class OCRPool:
+    """Pool de instâncias do Tesseract (a API não é thread-safe).
+
+    As instâncias são criadas sob demanda, até max_size; acima disso as
+    chamadas aguardam uma instância livre.
+    """
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self.lock:
+            create = self.created < self.max_size
+            if create:
+                self.created += 1
+        if not create:
+            return self.idle.get()
+        
+        try:
+            return PyTessBaseAPI(lang=OCR_LANG, psm=PSM.AUTO)
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+    
+    def release(self, tess):
+        self.idle.put(tess)
+
+@synchronized_cache
+def get_ocr_pool():
+    """Cria o pool de instâncias do Tesseract"""
+    return OCRPool(OCR_POOL_SIZE)
+
+@synchronized_cache
+def get_sentence_encoder():
+    """Carrega sob demanda o modelo de embeddings de sentenças"""
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+@synchronized_cache
+def get_entity_pca():
+    """Carrega a projeção PCA dos embeddings, se já tiver sido ajustada"""
+    try:
+        if not os.path.exists(PCA_MODEL_PATH):
+            return None
+        pca = joblib.load(PCA_MODEL_PATH)
+        # Projeções antigas (IncrementalPCA, centralizada) distorcem as distâncias
+        if not isinstance(pca, TruncatedSVD):
+            print(f"Projeção em {PCA_MODEL_PATH} desatualizada; gere novamente com fit_pca.py")
+            return None
+        return pca
+    except Exception as e:
+        print(f"Erro ao carregar projeção PCA: {str(e)}")
+        return None
+
+def project_entity_embeddings(embeds, pca):
+    """Projeta embeddings normalizados na base da PCA e renormaliza"""
+    embeds = embeds @ pca.components_.T.astype(np.float32)
+    embeds /= np.maximum(np.linalg.norm(embeds, axis=1, keepdims=True), 1e-12)
+    return embeds
 
-# Carregar modelos de IA
-try:
-    # Modelo para análise de texto e NER (Reconhecimento de Entidades Nomeadas)
-    nlp_ner = pipeline("ner", model="neuralmind/bert-base-portuguese-cased", aggregation_strategy="simple")
+def cluster_entity_embeddings(embeds):
+    """Rótulos DBSCAN (distância de cosseno, raio ENTITY_CLUSTER_EPS); -1 = sem grupo"""
+    # Grafo esparso de vizinhos dentro do raio (distância de cosseno),
+    # evitando a matriz de distâncias densa N x N
+    nn = NearestNeighbors(radius=ENTITY_CLUSTER_EPS, metric="cosine", n_jobs=-1).fit(embeds)
+    graph = nn.radius_neighbors_graph(embeds, mode="distance")
     
-    # Modelo para análise de sentimento em português
-    sentiment_analyzer = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
+    # Clusterização DBSCAN sobre as distâncias pré-computadas
+    return DBSCAN(
+        eps=ENTITY_CLUSTER_EPS,
+        min_samples=2,
+        metric="precomputed",
+        n_jobs=-1
+    ).fit_predict(graph)
+
+def fit_entity_pca(corpus_path=PCA_CORPUS_PATH):
+    """Ajusta a projeção PCA no corpus de bootstrap e a grava em PCA_MODEL_PATH.
+
+    Antes de gravar, confere em uma amostra do corpus que a clusterização
+    com a projeção concorda com a do espaço completo; retorna (pca, concordância).
+    Executa inferência do modelo de embeddings; deve rodar como etapa de
+    build (fit_pca.py), nunca no processo do servidor antes do fork.
+    """
+    with open(corpus_path, encoding='utf-8') as f:
+        corpus = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    if len(corpus) < PCA_COMPONENTS:
+        raise ValueError(f"Corpus PCA com {len(corpus)} entradas; são necessárias ao menos {PCA_COMPONENTS}")
     
-    # Modelo para Q&A (Pergunta e Resposta)
-    qa_tokenizer = AutoTokenizer.from_pretrained("pierreguillou/bert-base-cased-squad-v1.1-portuguese")
-    qa_model = AutoModelForQuestionAnswering.from_pretrained("pierreguillou/bert-base-cased-squad-v1.1-portuguese")
-    qa_pipeline = pipeline("question-answering", model=qa_model, tokenizer=qa_tokenizer)
+    with torch.inference_mode():
+        embeds = get_sentence_encoder().encode(
+            corpus,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+    # Sem centralizar: a base precisa conter a direção média dos embeddings
+    embeds = embeds.astype(np.float32)
+    pca = TruncatedSVD(n_components=PCA_COMPONENTS, random_state=0)
+    pca.fit(embeds)
     
-    print("Modelos de IA carregados com sucesso!")
-except Exception as e:
-    print(f"Erro ao carregar modelos de IA: {str(e)}")
-    nlp_ner = None
-    sentiment_analyzer = None
-    qa_pipeline = None
+    # Mesmos rótulos com e sem projeção: ENTITY_CLUSTER_EPS vale nos dois espaços
+    rng = np.random.default_rng(0)
+    sample = embeds[rng.choice(len(embeds), min(len(embeds), PCA_CHECK_SAMPLE), replace=False)]
+    agreement = adjusted_rand_score(
+        cluster_entity_embeddings(sample),
+        cluster_entity_embeddings(project_entity_embeddings(sample, pca))
+    )
+    if agreement < PCA_MIN_AGREEMENT:
+        raise ValueError(
+            f"Clusterização com projeção diverge do espaço completo "
+            f"(concordância {agreement:.3f} < {PCA_MIN_AGREEMENT})"
+        )
+    
+    tmp_path = f"{PCA_MODEL_PATH}.tmp"
+    joblib.dump(pca, tmp_path)
+    os.replace(tmp_path, PCA_MODEL_PATH)
+    return pca, agreement
+
+def load_models():
+    """Carrega todos os modelos de IA antecipadamente.
+
+    Usado com o preload do Gunicorn: os pesos carregados no processo mestre
+    são compartilhados com os workers via copy-on-write. Com CUDA os modelos
+    continuam sob demanda, pois o contexto da GPU não sobrevive ao fork.
+    Apenas carrega pesos: nenhuma inferência roda aqui, para que os pools de
+    threads (OpenMP, tokenizers) não sejam iniciados antes do fork.
+    Com RASTRO_ONNX=1, NER e Q&A também ficam sob demanda: a sessão do ONNX
+    Runtime inicia seu pool de threads ao ser criada, e essas threads não
+    existem nos workers após o fork.
+    """
+    if USE_CUDA:
+        return
+    if not RASTRO_ONNX:
+        get_ner()
+        get_qa()
+    get_sentiment_analyzer()
+    get_sentence_encoder()
+    get_entity_pca()
+
+def gallery_sq_norms(known_matrix):
+    """Normas ao quadrado (float32) das linhas da galeria, convertida em blocos"""
+    sq_norms = np.empty(len(known_matrix), dtype=np.float32)
+    for start in range(0, len(known_matrix), FACE_MATCH_CHUNK):
+        chunk = known_matrix[start:start + FACE_MATCH_CHUNK].astype(np.float32)
+        sq_norms[start:start + FACE_MATCH_CHUNK] = np.einsum('nk,nk->n', chunk, chunk)
+    return sq_norms
+
+def best_face_matches(face_encodings, known_matrix, known_sq_norms):
+    """Melhor rosto conhecido para cada codificação.
+
+    Equivale a face_recognition.face_distance/compare_faces com
+    FACE_MATCH_TOLERANCE (conferido por check_face_match.py); retorna
+    (índices, distâncias euclidianas, correspondências).
+    """
+    # Distâncias euclidianas ao quadrado (M, N) entre rostos detectados e conhecidos:
+    # |k|² - 2·p·k + |p|², com GEMM e saída (M, N); a galeria em float16 é
+    # convertida para float32 em blocos, sem copiar a matriz inteira
+    probes = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+    dists = np.empty((len(probes), len(known_matrix)), dtype=np.float32)
+    for start in range(0, len(known_matrix), FACE_MATCH_CHUNK):
+        chunk = known_matrix[start:start + FACE_MATCH_CHUNK].astype(np.float32)
+        np.matmul(probes, chunk.T, out=dists[:, start:start + FACE_MATCH_CHUNK])
+    dists *= -2
+    dists += known_sq_norms[None, :]
+    dists += np.einsum('mk,mk->m', probes, probes)[:, None]
+    # Erros de arredondamento podem gerar valores levemente negativos
+    np.maximum(dists, 0, out=dists)
+    
+    # Melhor correspondência por rosto detectado
+    best = dists.argmin(axis=1)
+    best_dists = np.sqrt(dists[np.arange(len(probes)), best])
+    return best, best_dists, best_dists <= FACE_MATCH_TOLERANCE
 
 # ... (código anterior para ferramentas, monitored_items e funções de investigação) ...
 
@@ -75,118 +607,325 @@ except Exception as e:
 
 class IAInvestigation:
     def __init__(self):
+        # Cada worker tem sua cópia da galeria; mudanças no diretório feitas por
+        # outro worker são detectadas pelo mtime e recarregadas no próximo uso
+        self.known_faces_lock = threading.Lock()
+        self.known_faces_mtime = self.known_faces_folder_mtime()
         self.known_faces = self.load_known_faces()
+        self.build_known_matrix()
+        self.embedding_cache = LRUCache(EMBEDDING_CACHE_SIZE)
+        self.analysis_cache = LRUCache(ANALYSIS_CACHE_SIZE)
+    
+    def load_face_cache(self):
+        """Carrega o cache de codificações: filename -> (mtime, encoding ou None se não há rosto)"""
+        if not os.path.exists(KNOWN_FACES_CACHE):
+            return {}
+        try:
+            cache = np.load(KNOWN_FACES_CACHE, allow_pickle=True)
+            filenames = cache['filenames']
+            has_face = cache['has_face'] if 'has_face' in cache.files else np.ones(len(filenames), dtype=bool)
+            return {
+                filename: (mtime, encoding if found else None)
+                for filename, mtime, encoding, found in zip(filenames, cache['mtimes'], cache['encodings'], has_face)
+            }
+        except Exception as e:
+            print(f"Erro ao carregar cache de rostos: {str(e)}")
+            return {}
+    
+    def save_face_cache(self, cache):
+        """Salva o cache de codificações de rostos conhecidos"""
+        tmp_path = None
+        try:
+            filenames = list(cache.keys())
+            # Imagens sem rosto ficam no cache com codificação zerada e has_face=False
+            empty = np.zeros(128, dtype=KNOWN_FACES_DTYPE)
+            # Gravado em arquivo temporário e renomeado, para que outros workers
+            # nunca leiam um cache pela metade
+            with tempfile.NamedTemporaryFile(dir=KNOWN_FACES_FOLDER, suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                np.savez_compressed(
+                    f,
+                    filenames=np.array(filenames, dtype=object),
+                    mtimes=np.array([cache[name][0] for name in filenames], dtype=np.float64),
+                    encodings=np.array(
+                        [empty if cache[name][1] is None else cache[name][1] for name in filenames],
+                        dtype=KNOWN_FACES_DTYPE
+                    ).reshape(-1, 128),
+                    has_face=np.array([cache[name][1] is not None for name in filenames], dtype=bool)
+                )
+            os.replace(tmp_path, KNOWN_FACES_CACHE)
+        except Exception as e:
+            print(f"Erro ao salvar cache de rostos: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def load_known_faces(self):
-        """Carrega rostos conhecidos do diretório de faces conhecidas"""
+        """Carrega rostos conhecidos do diretório de faces conhecidas.
+        
+        Apenas as imagens novas ou modificadas (mtime diferente do cache)
+        passam novamente pelo face_encodings.
+        """
         known_faces = {}
-        for filename in os.listdir(KNOWN_FACES_FOLDER):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                path = os.path.join(KNOWN_FACES_FOLDER, filename)
-                image = face_recognition.load_image_file(path)
-                encodings = face_recognition.face_encodings(image)
-                if encodings:
-                    # Usar o nome do arquivo (sem extensão) como identificador
-                    person_id = os.path.splitext(filename)[0]
-                    known_faces[person_id] = encodings[0]
+        cache = self.load_face_cache()
+        new_cache = {}
+        changed = False
+        for entry in os.scandir(KNOWN_FACES_FOLDER):
+            if entry.is_file() and entry.name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                mtime = entry.stat().st_mtime
+                cached = cache.get(entry.name)
+                if cached is not None and cached[0] == mtime:
+                    encoding = cached[1]
+                else:
+                    image = face_recognition.load_image_file(entry.path)
+                    encodings = face_recognition.face_encodings(image)
+                    encoding = encodings[0] if encodings else None
+                    changed = True
+                new_cache[entry.name] = (mtime, encoding)
+                
+                # Imagens sem rosto detectável ficam só no cache
+                if encoding is None:
+                    continue
+                # Usar o nome do arquivo (sem extensão) como identificador
+                person_id = os.path.splitext(entry.name)[0]
+                known_faces[person_id] = encoding.astype(KNOWN_FACES_DTYPE)
+        
+        if changed or new_cache.keys() != cache.keys():
+            self.save_face_cache(new_cache)
         return known_faces
     
-    def add_known_face(self, image_path, person_id):
+    def build_known_matrix(self):
+        """Monta a matriz (N, 128) de codificações e a lista paralela de IDs"""
+        self.known_ids = list(self.known_faces.keys())
+        self.known_matrix = np.ascontiguousarray(
+            np.array(list(self.known_faces.values()), dtype=KNOWN_FACES_DTYPE).reshape(-1, 128)
+        )
+        # Normas ao quadrado da galeria, pré-calculadas para a comparação
+        self.known_sq_norms = gallery_sq_norms(self.known_matrix)
+    
+    def known_faces_folder_mtime(self):
+        """mtime do diretório de faces conhecidas (muda a cada arquivo criado, removido ou renomeado)"""
+        try:
+            return os.stat(KNOWN_FACES_FOLDER).st_mtime_ns
+        except OSError:
+            return None
+    
+    def refresh_known_faces(self):
+        """Recarrega a galeria se o diretório de faces conhecidas mudou desde a última carga.
+
+        Com vários workers, um rosto adicionado em um deles passa a ser
+        reconhecido pelos demais; só as imagens novas são codificadas, as
+        outras vêm do cache em disco.
+        """
+        mtime = self.known_faces_folder_mtime()
+        if mtime == self.known_faces_mtime:
+            return
+        with self.known_faces_lock:
+            if mtime == self.known_faces_mtime:
+                return
+            self.known_faces_mtime = mtime
+            self.known_faces = self.load_known_faces()
+            self.build_known_matrix()
+    
+    def add_known_face(self, image, person_id):
         """Adiciona um novo rosto conhecido ao sistema"""
         try:
-            image = face_recognition.load_image_file(image_path)
             encodings = face_recognition.face_encodings(image)
             if encodings:
-                self.known_faces[person_id] = encodings[0]
-                # Salvar a imagem no diretório de faces conhecidas
-                output_path = os.path.join(KNOWN_FACES_FOLDER, f"{person_id}.jpg")
-                Image.open(image_path).save(output_path)
+                encoding = encodings[0].astype(KNOWN_FACES_DTYPE)
+                
+                # Salvar a imagem no diretório de faces conhecidas; a renomeação
+                # atualiza o mtime do diretório mesmo quando a imagem é substituída,
+                # sinalizando a mudança aos outros workers
+                filename = f"{person_id}.jpg"
+                output_path = os.path.join(KNOWN_FACES_FOLDER, filename)
+                with tempfile.NamedTemporaryFile(dir=KNOWN_FACES_FOLDER, suffix='.tmp', delete=False) as f:
+                    Image.fromarray(image).save(f, format='JPEG')
+                os.replace(f.name, output_path)
+                
+                # Registrar a codificação no cache em disco, para que os outros
+                # workers não precisem codificar a imagem de novo
+                with self.known_faces_lock:
+                    cache = self.load_face_cache()
+                    cache[filename] = (os.stat(output_path).st_mtime, encoding)
+                    self.save_face_cache(cache)
+                    self.known_faces[person_id] = encoding
+                    self.build_known_matrix()
                 return True
             return False
         except Exception as e:
             print(f"Erro ao adicionar rosto conhecido: {str(e)}")
             return False
     
-    def recognize_faces(self, image_path):
+    def downscale_for_detection(self, image):
+        """Reduz a imagem para no máximo MAX_DETECTION_SIZE no lado maior; retorna (imagem, escala)"""
+        h, w = image.shape[:2]
+        if max(h, w) <= MAX_DETECTION_SIZE:
+            return image, 1.0
+        scale = MAX_DETECTION_SIZE / max(h, w)
+        small = Image.fromarray(image).resize((int(w * scale), int(h * scale)), Image.BILINEAR)
+        return np.array(small), scale
+    
+    def scale_locations(self, face_locations, scale):
+        """Converte as coordenadas (top, right, bottom, left) de volta para a imagem original"""
+        if scale == 1.0:
+            return face_locations
+        return [tuple(int(round(c / scale)) for c in location) for location in face_locations]
+    
+    def recognize_faces(self, unknown_image):
         """Reconhece rostos em uma imagem e compara com rostos conhecidos"""
         try:
-            # Carregar a imagem
-            unknown_image = face_recognition.load_image_file(image_path)
+            small_image, scale = self.downscale_for_detection(unknown_image)
             
             # Encontrar todos os rostos na imagem
-            face_locations = face_recognition.face_locations(unknown_image)
-            face_encodings = face_recognition.face_encodings(unknown_image, face_locations)
+            face_locations = face_recognition.face_locations(small_image, model=FACE_DETECTION_MODEL)
+            face_encodings = face_recognition.face_encodings(small_image, face_locations)
             
-            recognized = []
-            for i, face_encoding in enumerate(face_encodings):
-                # Comparar com rostos conhecidos
-                matches = face_recognition.compare_faces(
-                    list(self.known_faces.values()), 
-                    face_encoding
-                )
-                
-                name = "Desconhecido"
-                confidence = 0.0
-                
-                # Calcular distâncias
-                face_distances = face_recognition.face_distance(
-                    list(self.known_faces.values()), 
-                    face_encoding
-                )
-                
-                # Encontrar a melhor correspondência
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = list(self.known_faces.keys())[best_match_index]
-                    confidence = 1 - face_distances[best_match_index]
-                
-                recognized.append({
-                    "location": face_locations[i],
-                    "name": name,
-                    "confidence": round(confidence, 2)
-                })
-            
-            return recognized
+            return self.match_faces(self.scale_locations(face_locations, scale), face_encodings)
         except Exception as e:
             print(f"Erro no reconhecimento facial: {str(e)}")
             return []
     
+    def recognize_faces_batch(self, images):
+        """Reconhece rostos em várias imagens, detectando em lote na GPU (dlib com CUDA)"""
+        try:
+            scaled = [self.downscale_for_detection(image) for image in images]
+            images = [small_image for small_image, _ in scaled]
+            
+            if dlib.DLIB_USE_CUDA:
+                # batch_face_locations exige que todas as imagens do lote tenham o mesmo tamanho
+                batch_locations = [None] * len(images)
+                groups = {}
+                for i, image in enumerate(images):
+                    groups.setdefault(image.shape, []).append(i)
+                for indices in groups.values():
+                    locations = face_recognition.batch_face_locations(
+                        [images[i] for i in indices],
+                        number_of_times_to_upsample=1,
+                        batch_size=min(len(indices), FACE_BATCH_SIZE)
+                    )
+                    for i, image_locations in zip(indices, locations):
+                        batch_locations[i] = image_locations
+            else:
+                # Sem CUDA, caminho sequencial em CPU
+                batch_locations = [
+                    face_recognition.face_locations(image, model=FACE_DETECTION_MODEL)
+                    for image in images
+                ]
+            
+            # Codificar todos os rostos e comparar com os conhecidos em uma única chamada
+            all_locations = []
+            all_encodings = []
+            for image, locations, (_, scale) in zip(images, batch_locations, scaled):
+                all_locations.extend(self.scale_locations(locations, scale))
+                all_encodings.extend(face_recognition.face_encodings(image, locations))
+            recognized = self.match_faces(all_locations, all_encodings)
+            
+            # Separar os resultados por imagem
+            results = []
+            offset = 0
+            for locations in batch_locations:
+                results.append(recognized[offset:offset + len(locations)])
+                offset += len(locations)
+            return results
+        except Exception as e:
+            print(f"Erro no reconhecimento facial em lote: {str(e)}")
+            return [[] for _ in images]
+    
+    def match_faces(self, face_locations, face_encodings):
+        """Compara todas as codificações encontradas com os rostos conhecidos de uma vez"""
+        recognized = [
+            {"location": location, "name": "Desconhecido", "confidence": 0.0}
+            for location in face_locations
+        ]
+        self.refresh_known_faces()
+        if not face_encodings or not self.known_ids:
+            return recognized
+        
+        best, best_dists, matches = best_face_matches(face_encodings, self.known_matrix, self.known_sq_norms)
+        
+        for i in np.flatnonzero(matches):
+            recognized[i]["name"] = self.known_ids[best[i]]
+            recognized[i]["confidence"] = round(1 - float(best_dists[i]), 2)
+        
+        return recognized
+    
     def analyze_text(self, text):
         """Analisa texto usando NLP para extrair informações relevantes"""
-        if not nlp_ner:
+        analyses = self.analyze_texts([text])
+        return analyses[0] if isinstance(analyses, list) else analyses
+    
+    def analyze_texts(self, texts):
+        """Analisa vários textos de uma vez, sem repetir textos já analisados"""
+        ner_batcher = get_ner_batcher()
+        if not ner_batcher:
             return {"error": "Modelo NLP não disponível"}
+        sentiment_batcher = get_sentiment_batcher()
         
         try:
-            # Extrair entidades nomeadas
-            entities = nlp_ner(text)
+            keys = [hashlib.blake2b(text.encode()).digest() for text in texts]
             
-            # Analisar sentimento
-            sentiment = sentiment_analyzer(text)[0] if sentiment_analyzer else None
+            # Separar textos já em cache dos que precisam passar pelos modelos
+            analyses = {}
+            pending = {}
+            for key, text in zip(keys, texts):
+                if key in analyses or key in pending:
+                    continue
+                cached = self.analysis_cache.get(key)
+                if cached is None:
+                    pending[key] = text
+                else:
+                    analyses[key] = cached
             
-            # Classificar entidades
-            people = [e['word'] for e in entities if e['entity_group'] == 'PER']
-            locations = [e['word'] for e in entities if e['entity_group'] == 'LOC']
-            organizations = [e['word'] for e in entities if e['entity_group'] == 'ORG']
-            dates = [e['word'] for e in entities if e['entity_group'] == 'DATE']
+            if pending:
+                pending_texts = list(pending.values())
+                
+                # Enfileirar NER e sentimento juntos nos micro-lotes;
+                # textos muito curtos não passam pelo NER
+                ner_texts = [t for t in pending_texts if len(t.split()) >= MIN_NER_TOKENS]
+                ner_futures = dict(zip(ner_texts, ner_batcher.enqueue(ner_texts)))
+                if sentiment_batcher:
+                    sentiment_futures = sentiment_batcher.enqueue(pending_texts)
+                else:
+                    sentiment_futures = [None] * len(pending_texts)
+                
+                for (key, text), sentiment_future in zip(pending.items(), sentiment_futures):
+                    # Extrair entidades nomeadas
+                    entities = ner_futures[text].result() if text in ner_futures else []
+                    
+                    # Analisar sentimento
+                    sentiment = sentiment_future.result() if sentiment_future else None
+                    
+                    analyses[key] = self.build_text_analysis(entities, sentiment)
+                    self.analysis_cache.put(key, analyses[key])
             
-            return {
-                "entities": entities,
-                "sentiment": sentiment,
-                "people": list(set(people)),
-                "locations": list(set(locations)),
-                "organizations": list(set(organizations)),
-                "dates": list(set(dates))
-            }
+            return [analyses[key] for key in keys]
         except Exception as e:
             return {"error": str(e)}
     
+    def build_text_analysis(self, entities, sentiment):
+        """Classifica as entidades extraídas de um texto"""
+        people = [e['word'] for e in entities if e['entity_group'] == 'PER']
+        locations = [e['word'] for e in entities if e['entity_group'] == 'LOC']
+        organizations = [e['word'] for e in entities if e['entity_group'] == 'ORG']
+        dates = [e['word'] for e in entities if e['entity_group'] == 'DATE']
+        
+        return {
+            "entities": entities,
+            "sentiment": sentiment,
+            "people": list(set(people)),
+            "locations": list(set(locations)),
+            "organizations": list(set(organizations)),
+            "dates": list(set(dates))
+        }
+    
     def answer_question(self, context, question):
         """Responde perguntas baseadas em um contexto"""
-        if not qa_pipeline:
+        qa_batcher = get_qa_batcher()
+        if not qa_batcher:
             return {"error": "Modelo Q&A não disponível"}
         
         try:
-            result = qa_pipeline(question=question, context=context)
+            result = qa_batcher.submit({"question": question, "context": context})
             return {
                 "answer": result['answer'],
                 "score": result['score'],
@@ -196,36 +935,131 @@ class IAInvestigation:
         except Exception as e:
             return {"error": str(e)}
     
+    def build_hypotheses_request(self, evidence):
+        """Monta os parâmetros da chamada de chat para geração de hipóteses"""
+        prompt = f"""
+        Com base nas seguintes evidências de investigação, gere hipóteses sobre o paradeiro e atividades do indivíduo investigado.
+        Forneça também sugestões para próximos passos na investigação.
+
+        Evidências:
+        {json.dumps(evidence, indent=2, sort_keys=True)}
+
+        Hipóteses e Recomendações:
+        """
+        
+        return {
+            "model": OPENAI_MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 500,
+            "temperature": 0.7,
+            "top_p": 1.0,
+            "frequency_penalty": 0.0,
+            "presence_penalty": 0.0
+        }
+    
+    def hypotheses_cache_path(self, request_params):
+        """Caminho do cache em disco para uma chamada (modelo, prompt e parâmetros)"""
+        key = hashlib.blake2b(json.dumps(request_params, sort_keys=True).encode()).hexdigest()
+        return os.path.join(HYPOTHESES_CACHE_FOLDER, f"{key}.txt")
+    
+    def load_hypotheses_cache(self, cache_path):
+        """Lê as hipóteses do cache, se existirem e não tiverem expirado"""
+        try:
+            if time.time() - os.path.getmtime(cache_path) > HYPOTHESES_CACHE_TTL:
+                return None
+            with open(cache_path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def save_hypotheses_cache(self, cache_path, hypotheses):
+        """Grava as hipóteses geradas no cache em disco e remove entradas expiradas"""
+        # Arquivo temporário único: workers gravando a mesma chave não se sobrepõem
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', dir=HYPOTHESES_CACHE_FOLDER, suffix='.tmp', delete=False
+        ) as f:
+            f.write(hypotheses)
+        os.replace(f.name, cache_path)
+        
+        now = time.time()
+        for entry in os.scandir(HYPOTHESES_CACHE_FOLDER):
+            try:
+                if entry.name.endswith('.txt') and now - entry.stat().st_mtime > HYPOTHESES_CACHE_TTL:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+    
     def generate_investigation_hypotheses(self, evidence):
         """Gera hipóteses de investigação usando IA generativa"""
         if not OPENAI_API_KEY or OPENAI_API_KEY == 'SUA_CHAVE_OPENAI':
             return {"error": "Chave da API OpenAI não configurada"}
         
         try:
-            prompt = f"""
-            Com base nas seguintes evidências de investigação, gere hipóteses sobre o paradeiro e atividades do indivíduo investigado.
-            Forneça também sugestões para próximos passos na investigação.
-
-            Evidências:
-            {json.dumps(evidence, indent=2)}
-
-            Hipóteses e Recomendações:
-            """
+            # Evidências já analisadas retornam direto do cache
+            request_params = self.build_hypotheses_request(evidence)
+            cache_path = self.hypotheses_cache_path(request_params)
+            cached = self.load_hypotheses_cache(cache_path)
+            if cached is not None:
+                return cached
             
-            response = openai.Completion.create(
-                engine="text-davinci-003",
-                prompt=prompt,
-                max_tokens=500,
-                temperature=0.7,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0
-            )
+            response = get_openai_client().chat.completions.create(**request_params)
             
-            return response.choices[0].text.strip()
+            hypotheses = response.choices[0].message.content.strip()
+            self.save_hypotheses_cache(cache_path, hypotheses)
+            return hypotheses
         except Exception as e:
             return {"error": str(e)}
     
+    def stream_investigation_hypotheses(self, evidence):
+        """Gera hipóteses de investigação token a token (streaming)"""
+        if not OPENAI_API_KEY or OPENAI_API_KEY == 'SUA_CHAVE_OPENAI':
+            raise ValueError("Chave da API OpenAI não configurada")
+        
+        request_params = self.build_hypotheses_request(evidence)
+        cache_path = self.hypotheses_cache_path(request_params)
+        cached = self.load_hypotheses_cache(cache_path)
+        if cached is not None:
+            yield cached
+            return
+        
+        stream = get_openai_client().chat.completions.create(**request_params, stream=True)
+        
+        tokens = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                tokens.append(token)
+                yield token
+        
+        self.save_hypotheses_cache(cache_path, "".join(tokens).strip())
+    
+    def encode_entities(self, entities):
+        """Gera embeddings normalizados das entidades, reaproveitando o cache LRU"""
+        embeds = {}
+        missing = []
+        for entity in entities:
+            cached = self.embedding_cache.get(entity)
+            if cached is None:
+                missing.append(entity)
+            else:
+                embeds[entity] = cached
+        
+        if missing:
+            with torch.inference_mode():
+                new_embeds = get_sentence_encoder().encode(
+                    missing,
+                    batch_size=64,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            for entity, embed in zip(missing, new_embeds):
+                self.embedding_cache.put(entity, embed)
+                embeds[entity] = embed
+        
+        return np.stack([embeds[e] for e in entities]).astype(np.float32, copy=False)
+    
     def correlate_entities(self, entities_list):
         """Correlaciona entidades de diferentes fontes usando clusterização"""
         try:
@@ -234,21 +1068,26 @@ class IAInvestigation:
             for entities in entities_list:
                 all_entities.extend(entities)
             
-            # Converter para conjunto para remover duplicatas
-            unique_entities = list(set(all_entities))
+            # Remover duplicatas mantendo a ordem de chegada
+            unique_entities = list(dict.fromkeys(all_entities))
+            if not unique_entities:
+                return {}
+            
+            # Embeddings de sentença das entidades
+            embeds = self.encode_entities(unique_entities)
             
-            # Criar matriz de similaridade (simplificada)
-            # Em implementação real, usar embeddings de texto
-            entity_matrix = np.zeros((len(unique_entities), dtype=int)
+            # Reduzir para 128 dimensões (float32) quando houver projeção PCA;
+            # a base não centralizada e a renormalização mantêm as distâncias de cosseno
+            pca = get_entity_pca()
+            if pca is not None:
+                embeds = project_entity_embeddings(embeds, pca)
             
-            # Clusterização DBSCAN (exemplo simplificado)
-            # Em implementação real, usar embeddings mais sofisticados
-            X = StandardScaler().fit_transform(entity_matrix.reshape(-1, 1))
-            clustering = DBSCAN(eps=0.5, min_samples=2).fit(X)
+            labels = cluster_entity_embeddings(embeds)
             
-            # Agrupar entidades por cluster
+            # Agrupar entidades por cluster (-1 = entidades sem grupo)
             clusters = {}
-            for i, label in enumerate(clustering.labels_):
+            for i, label in enumerate(labels):
+                label = int(label)
                 if label not in clusters:
                     clusters[label] = []
                 clusters[label].append(unique_entities[i])
@@ -260,45 +1099,47 @@ class IAInvestigation:
     def analyze_social_connections(self, social_data):
         """Analisa conexões sociais para identificar relacionamentos-chave"""
         try:
-            # Estrutura para armazenar conexões
-            connections = {}
+            # Uma linha por conexão: (plataforma, nome, relação)
+            rows = [
+                (platform, connection.get('name', ''), connection.get('relation', ''))
+                for platform, data in social_data.items()
+                for connection in data.get('connections', [])
+            ]
+            if not rows:
+                return {'all_connections': {}, 'top_connections': []}
             
-            # Simulação de análise - em produção seria mais complexo
-            for platform, data in social_data.items():
-                if 'connections' in data:
-                    for connection in data['connections']:
-                        name = connection.get('name', '')
-                        relation = connection.get('relation', '')
-                        
-                        if name not in connections:
-                            connections[name] = {
-                                'relations': set(),
-                                'platforms': set(),
-                                'occurrences': 0
-                            }
-                        
-                        connections[name]['relations'].add(relation)
-                        connections[name]['platforms'].add(platform)
-                        connections[name]['occurrences'] += 1
+            df = pd.DataFrame(rows, columns=['platform', 'name', 'relation'])
             
-            # Converter sets para lists para serialização
-            for name, data in connections.items():
-                data['relations'] = list(data['relations'])
-                data['platforms'] = list(data['platforms'])
-            
-            # Identificar conexões mais relevantes
-            sorted_connections = sorted(
-                connections.items(), 
-                key=lambda x: x[1]['occurrences'], 
-                reverse=True
+            # Agregar relações, plataformas e ocorrências por pessoa
+            grouped = df.groupby('name', sort=False, dropna=False).agg(
+                relations=('relation', lambda x: list(set(x))),
+                platforms=('platform', lambda x: list(set(x))),
+                occurrences=('platform', 'size')
             )
+            connections = grouped.to_dict(orient='index')
+            
+            # Identificar conexões mais relevantes (Top 5)
+            top = grouped.nlargest(5, 'occurrences')
             
             return {
                 'all_connections': connections,
-                'top_connections': sorted_connections[:5]  # Top 5 conexões
+                'top_connections': [(name, connections[name]) for name in top.index]
             }
         except Exception as e:
             return {"error": str(e)}
+    
+    def extract_text(self, image):
+        """Extrai texto de uma imagem via OCR"""
+        try:
+            pool = get_ocr_pool()
+            tess = pool.acquire()
+            try:
+                tess.SetImage(image)
+                return {"text": tess.GetUTF8Text()}
+            finally:
+                pool.release(tess)
+        except Exception as e:
+            return {"error": str(e)}
 
 # Inicializar o módulo de IA
 ia_system = IAInvestigation()
@@ -307,76 +1148,132 @@ ia_system = IAInvestigation()
 # ROTAS DE IA
 # ==============================
 
+def json_response(payload):
+    """Serializa a resposta com orjson (tipos numpy e chaves não-string inclusos)"""
+    return app.response_class(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS),
+        mimetype='application/json'
+    )
+
+def load_upload_image(file):
+    """Decodifica a imagem enviada direto da memória, em RGB"""
+    return np.array(Image.open(file.stream).convert("RGB"))
+
 @app.route('/ia/recognize_faces', methods=['POST'])
 def ia_recognize_faces():
     """Reconhece rostos em uma imagem enviada"""
     if 'file' not in request.files:
-        return jsonify({"status": "error", "message": "Nenhum arquivo enviado"})
+        return json_response({"status": "error", "message": "Nenhum arquivo enviado"})
     
     file = request.files['file']
     if file.filename == '':
-        return jsonify({"status": "error", "message": "Nome de arquivo vazio"})
+        return json_response({"status": "error", "message": "Nome de arquivo vazio"})
     
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(file_path)
+    try:
+        image = load_upload_image(file)
+    except Exception as e:
+        return json_response({"status": "error", "message": f"Imagem inválida: {str(e)}"})
     
     # Reconhecer rostos
-    recognized_faces = ia_system.recognize_faces(file_path)
+    recognized_faces = ia_system.recognize_faces(image)
     
-    # Remover arquivo após análise
-    @after_this_request
-    def remove_file(response):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            app.logger.error(f"Erro ao remover arquivo: {str(e)}")
-        return response
+    return json_response({"status": "success", "results": recognized_faces})
+
+@app.route('/ia/recognize_faces_batch', methods=['POST'])
+def ia_recognize_faces_batch():
+    """Reconhece rostos em várias imagens enviadas de uma vez"""
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if not files:
+        return json_response({"status": "error", "message": "Nenhum arquivo enviado"})
     
-    return jsonify({"status": "success", "results": recognized_faces})
+    if len(files) > FACE_BATCH_MAX_FILES:
+        return json_response({
+            "status": "error",
+            "message": f"Máximo de {FACE_BATCH_MAX_FILES} arquivos por requisição"
+        }), 400
+    
+    try:
+        images = [load_upload_image(f) for f in files]
+    except Exception as e:
+        return json_response({"status": "error", "message": f"Imagem inválida: {str(e)}"})
+    
+    # Reconhecer rostos em lote
+    recognized_faces = ia_system.recognize_faces_batch(images)
+    
+    results = [
+        {"filename": f.filename, "faces": faces}
+        for f, faces in zip(files, recognized_faces)
+    ]
+    return json_response({"status": "success", "results": results})
 
 @app.route('/ia/add_known_face', methods=['POST'])
 def ia_add_known_face():
     """Adiciona um novo rosto conhecido ao sistema"""
     if 'file' not in request.files:
-        return jsonify({"status": "error", "message": "Nenhum arquivo enviado"})
+        return json_response({"status": "error", "message": "Nenhum arquivo enviado"})
     
     file = request.files['file']
     person_id = request.form.get('person_id', '')
     
     if not person_id:
-        return jsonify({"status": "error", "message": "ID da pessoa não fornecido"})
+        return json_response({"status": "error", "message": "ID da pessoa não fornecido"})
     
     if file.filename == '':
-        return jsonify({"status": "error", "message": "Nome de arquivo vazio"})
-    
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(file_path)
-    
-    # Adicionar rosto conhecido
-    success = ia_system.add_known_face(file_path, person_id)
+        return json_response({"status": "error", "message": "Nome de arquivo vazio"})
     
-    # Remover arquivo temporário
     try:
-        os.remove(file_path)
+        image = load_upload_image(file)
     except Exception as e:
-        app.logger.error(f"Erro ao remover arquivo: {str(e)}")
+        return json_response({"status": "error", "message": f"Imagem inválida: {str(e)}"})
+    
+    # Adicionar rosto conhecido
+    success = ia_system.add_known_face(image, person_id)
     
     if success:
-        return jsonify({"status": "success", "message": "Rosto adicionado com sucesso"})
+        return json_response({"status": "success", "message": "Rosto adicionado com sucesso"})
     else:
-        return jsonify({"status": "error", "message": "Não foi possível adicionar o rosto"})
+        return json_response({"status": "error", "message": "Não foi possível adicionar o rosto"})
 
 @app.route('/ia/analyze_text', methods=['POST'])
 def ia_analyze_text():
     """Analisa texto usando NLP"""
     data = request.json
-    text = data.get('text', '')
     
+    # Vários textos ("texts") são analisados em lote
+    texts = data.get('texts')
+    if texts is not None:
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) and t for t in texts):
+            return json_response({"status": "error", "message": "'texts' deve ser uma lista de textos não vazios"}), 400
+        
+        analyses = ia_system.analyze_texts(texts)
+        if isinstance(analyses, dict):
+            return json_response({"status": "error", "message": analyses.get("error")}), 500
+        return json_response({"status": "success", "results": analyses})
+    
+    text = data.get('text', '')
     if not text:
-        return jsonify({"status": "error", "message": "Texto vazio"}), 400
+        return json_response({"status": "error", "message": "Texto vazio"}), 400
     
     analysis = ia_system.analyze_text(text)
-    return jsonify({"status": "success", "results": analysis})
+    return json_response({"status": "success", "results": analysis})
+
+@app.route('/ia/extract_text', methods=['POST'])
+def ia_extract_text():
+    """Extrai texto de uma imagem enviada (OCR)"""
+    if 'file' not in request.files:
+        return json_response({"status": "error", "message": "Nenhum arquivo enviado"})
+    
+    file = request.files['file']
+    if file.filename == '':
+        return json_response({"status": "error", "message": "Nome de arquivo vazio"})
+    
+    try:
+        image = Image.open(file.stream)
+    except Exception as e:
+        return json_response({"status": "error", "message": f"Imagem inválida: {str(e)}"})
+    
+    result = ia_system.extract_text(image)
+    return json_response({"status": "success", "results": result})
 
 @app.route('/ia/generate_hypotheses', methods=['POST'])
 def ia_generate_hypotheses():
@@ -385,10 +1282,22 @@ def ia_generate_hypotheses():
     evidence = data.get('evidence', {})
     
     if not evidence:
-        return jsonify({"status": "error", "message": "Nenhuma evidência fornecida"}), 400
+        return json_response({"status": "error", "message": "Nenhuma evidência fornecida"}), 400
+    
+    # Com "stream": true as hipóteses são enviadas via Server-Sent Events
+    if data.get('stream'):
+        def generate():
+            try:
+                for token in ia_system.stream_investigation_hypotheses(evidence):
+                    yield f"data: {json.dumps(token)}\n\n"
+                yield "data: [DONE]\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream')
     
     hypotheses = ia_system.generate_investigation_hypotheses(evidence)
-    return jsonify({"status": "success", "results": hypotheses})
+    return json_response({"status": "success", "results": hypotheses})
 
 @app.route('/ia/answer_question', methods=['POST'])
 def ia_answer_question():
@@ -398,10 +1307,10 @@ def ia_answer_question():
     question = data.get('question', '')
     
     if not context or not question:
-        return jsonify({"status": "error", "message": "Contexto ou pergunta ausentes"}), 400
+        return json_response({"status": "error", "message": "Contexto ou pergunta ausentes"}), 400
     
     answer = ia_system.answer_question(context, question)
-    return jsonify({"status": "success", "results": answer})
+    return json_response({"status": "success", "results": answer})
 
 @app.route('/ia/correlate_entities', methods=['POST'])
 def ia_correlate_entities():
@@ -410,10 +1319,10 @@ def ia_correlate_entities():
     entities_list = data.get('entities_list', [])
     
     if not entities_list:
-        return jsonify({"status": "error", "message": "Lista de entidades vazia"}), 400
+        return json_response({"status": "error", "message": "Lista de entidades vazia"}), 400
     
     clusters = ia_system.correlate_entities(entities_list)
-    return jsonify({"status": "success", "results": clusters})
+    return json_response({"status": "success", "results": clusters})
 
 @app.route('/ia/analyze_social_connections', methods=['POST'])
 def ia_analyze_social_connections():
@@ -422,10 +1331,298 @@ def ia_analyze_social_connections():
     social_data = data.get('social_data', {})
     
     if not social_data:
-        return jsonify({"status": "error", "message": "Dados sociais ausentes"}), 400
+        return json_response({"status": "error", "message": "Dados sociais ausentes"}), 400
     
     analysis = ia_system.analyze_social_connections(social_data)
-    return jsonify({"status": "success", "results": analysis})
+    return json_response({"status": "success", "results": analysis})
+
+# ==============================
+# MÓDULO OSINT ASSÍNCRONO
+# ==============================
+
+class OSINTCache:
+    """Cache em disco (SQLite) das respostas JSON das APIs OSINT, com TTL.
+
+    Guarda apenas a URL sem credenciais (como chave) e o corpo JSON da
+    resposta; chaves de API nunca são gravadas e trocá-las não invalida o cache.
+    As chamadas são bloqueantes e devem rodar fora do event loop
+    (asyncio.to_thread); cada chamada usa sua própria conexão.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.initialized = False
+        self.next_prune = 0
+        self.lock = threading.Lock()
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path)
+        with self.lock:
+            if not self.initialized:
+                # WAL: leituras não esperam pela escrita de outros workers
+                conn.execute("PRAGMA journal_mode=WAL")
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires REAL, body TEXT)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)")
+                self.initialized = True
+        return conn
+    
+    def get(self, key):
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT expires, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return json.loads(row[1])
+    
+    def put(self, key, value, ttl):
+        now = time.time()
+        # Entradas expiradas são removidas periodicamente, não a cada gravação
+        with self.lock:
+            prune = now >= self.next_prune
+            if prune:
+                self.next_prune = now + OSINT_CACHE_PRUNE_INTERVAL
+        
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, now + ttl, json.dumps(value))
+            )
+            if prune:
+                conn.execute("DELETE FROM responses WHERE expires < ?", (now,))
+
+class OSINTEnricher:
+    """Consulta as fontes OSINT de um IP em paralelo, em um event loop dedicado.
+
+    O loop roda em uma thread própria, iniciada no primeiro uso, e mantém uma
+    única sessão HTTP (conexões TLS e cache de DNS reaproveitados entre requisições),
+    com as respostas das APIs guardadas em cache SQLite com TTL.
+    """
+    
+    def __init__(self):
+        self.loop = None
+        self.session = None
+        self.resolver = None
+        self.cache = OSINTCache(OSINT_CACHE_PATH)
+        self.lock = threading.Lock()
+    
+    def run(self, coro):
+        """Executa uma corrotina no event loop OSINT e aguarda o resultado"""
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    def get_session(self):
+        """Cria a sessão HTTP e o resolvedor DNS (dentro do event loop OSINT)"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=OSINT_MAX_CONNECTIONS, ttl_dns_cache=OSINT_DNS_CACHE_TTL)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=OSINT_TIMEOUT)
+            )
+            self.resolver = aiodns.DNSResolver()
+        return self.session
+    
+    async def fetch_json(self, url, params=None, headers=None, credentials=None, ttl=OSINT_CACHE_TTL):
+        """GET de uma API JSON com cache em disco.
+
+        Credenciais vão em `credentials` (parâmetros de query) ou `headers`;
+        nenhum dos dois entra na chave do cache nem é gravado.
+        """
+        params = params or {}
+        key = f"{url}?{urlencode(sorted(params.items()))}"
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+        
+        async with self.get_session().get(url, params={**params, **(credentials or {})}, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+        
+        await asyncio.to_thread(self.cache.put, key, data, ttl)
+        return data
+    
+    async def reverse_dns(self, ip):
+        result = await self.resolver.query(ipaddress.ip_address(ip).reverse_pointer, 'PTR')
+        return result.name
+    
+    async def whois_ip(self, ip):
+        _, parsed = await asyncwhois.aio_whois(ip)
+        return parsed
+    
+    async def enrich(self, ip):
+        """Consulta DNS reverso, WHOIS, Shodan, VirusTotal e AbuseIPDB simultaneamente"""
+        self.get_session()
+        sources = {
+            "dns": self.reverse_dns(ip),
+            "whois": self.whois_ip(ip),
+            "shodan": self.fetch_json(
+                f"https://api.shodan.io/shodan/host/{ip}",
+                credentials={"key": SHODAN_API_KEY}
+            ),
+            "virustotal": self.fetch_json(
+                f"https://www.virustotal.com/api/v3/ip_addresses/{ip}",
+                headers={"x-apikey": VIRUSTOTAL_API_KEY},
+                ttl=OSINT_VT_CACHE_TTL
+            ),
+            "abuseipdb": self.fetch_json(
+                "https://api.abuseipdb.com/api/v2/check",
+                params={"ipAddress": ip, "maxAgeInDays": 90},
+                headers={"Key": ABUSEIPDB_API_KEY, "Accept": "application/json"}
+            )
+        }
+        results = await asyncio.gather(*sources.values(), return_exceptions=True)
+        
+        # Falhas de uma fonte não invalidam as demais
+        return {
+            name: {"error": str(result)} if isinstance(result, Exception) else result
+            for name, result in zip(sources, results)
+        }
+    
+    def enrich_ip(self, ip):
+        """Enriquece um IP com todas as fontes OSINT"""
+        return self.run(self.enrich(ip))
+    
+    async def masscan(self, targets, ports):
+        """Descobre portas abertas com o masscan, lendo o JSON conforme é emitido"""
+        process = await asyncio.create_subprocess_exec(
+            MASSCAN_PATH, f"-p{ports}", *targets,
+            "--rate", str(MASSCAN_RATE),
+            "-oJ", "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        
+        open_ports = {}
+        try:
+            async for line in process.stdout:
+                # Cada registro vem em uma linha: {"ip": ..., "ports": [...]},
+                line = line.decode(errors='replace').strip().rstrip(',')
+                if not line.startswith('{'):
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Linhas inesperadas são ignoradas, sem interromper a leitura
+                    continue
+                for port in record.get('ports', []):
+                    if port.get('status') == 'open':
+                        open_ports.setdefault(record['ip'], set()).add(port['port'])
+            
+            if await process.wait() != 0:
+                raise RuntimeError(f"masscan terminou com código {process.returncode}")
+        finally:
+            # Em caso de erro ou cancelamento (timeout), o masscan não pode
+            # continuar enviando pacotes ao alvo
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+        return open_ports
+    
+    def nmap_scan(self, hosts, ports):
+        """Executa uma única varredura nmap com detecção de serviço/versão em todos os hosts"""
+        scanner = nmap.PortScanner()
+        # O nmap roda em uma thread, que o cancelamento não interrompe;
+        # o timeout próprio encerra o processo
+        scanner.scan(hosts=' '.join(hosts), ports=ports, arguments='-sV', timeout=PORT_SCAN_TIMEOUT)
+        
+        results = {}
+        for host in scanner.all_hosts():
+            services = []
+            for protocol in scanner[host].all_protocols():
+                for port, info in scanner[host][protocol].items():
+                    if info.get('state') == 'open':
+                        services.append({
+                            "port": port,
+                            "protocol": protocol,
+                            "service": info.get('name'),
+                            "product": info.get('product'),
+                            "version": info.get('version')
+                        })
+            results[host] = services
+        return results
+    
+    async def scan(self, targets, ports):
+        """Varredura em duas fases: masscan nos alvos e nmap nos hosts vivos"""
+        if MASSCAN_PATH:
+            try:
+                open_ports = await self.masscan(targets, ports)
+            except Exception as e:
+                print(f"Erro no masscan, usando apenas o nmap: {str(e)}")
+            else:
+                if not open_ports:
+                    return {}
+                live_ports = sorted({port for found in open_ports.values() for port in found})
+                return await asyncio.to_thread(
+                    self.nmap_scan,
+                    list(open_ports),
+                    ','.join(map(str, live_ports))
+                )
+        
+        return await asyncio.to_thread(self.nmap_scan, targets, ports)
+    
+    def scan_ports(self, targets, ports):
+        """Varre as portas dos alvos (IPs ou redes CIDR)"""
+        try:
+            return self.run(asyncio.wait_for(self.scan(targets, ports), PORT_SCAN_TIMEOUT))
+        except asyncio.TimeoutError:
+            return {"error": f"Varredura excedeu o tempo limite de {PORT_SCAN_TIMEOUT}s"}
+        except Exception as e:
+            return {"error": str(e)}
+
+# Inicializar o módulo OSINT
+osint_enricher = OSINTEnricher()
+
+# ==============================
+# ROTAS OSINT
+# ==============================
+
+@app.route('/osint/enrich_ip', methods=['POST'])
+def osint_enrich_ip():
+    """Consulta todas as fontes OSINT de um IP em paralelo"""
+    data = request.json
+    ip = data.get('ip', '')
+    
+    try:
+        ip = str(ipaddress.ip_address(ip))
+    except ValueError:
+        return json_response({"status": "error", "message": "IP inválido"}), 400
+    
+    results = osint_enricher.enrich_ip(ip)
+    return json_response({"status": "success", "results": results})
+
+@app.route('/osint/port_scan', methods=['POST'])
+def osint_port_scan():
+    """Varre portas de IPs/redes com masscan + nmap"""
+    data = request.json
+    targets = data.get('targets', [])
+    ports = str(data.get('ports', DEFAULT_SCAN_PORTS))
+    
+    if not targets:
+        return json_response({"status": "error", "message": "Nenhum alvo fornecido"}), 400
+    
+    try:
+        networks = [ipaddress.ip_network(target, strict=False) for target in targets]
+    except ValueError:
+        return json_response({"status": "error", "message": "Alvo inválido"}), 400
+    
+    # Limitar o escopo da varredura
+    if sum(network.num_addresses for network in networks) > MAX_SCAN_ADDRESSES:
+        return json_response({"status": "error", "message": "Escopo de varredura muito grande"}), 400
+    
+    if not re.fullmatch(r'\d+(-\d+)?(,\d+(-\d+)?)*', ports):
+        return json_response({"status": "error", "message": "Portas inválidas"}), 400
+    
+    results = osint_enricher.scan_ports([str(network) for network in networks], ports)
+    return json_response({"status": "success", "results": results})
 
 # ... (rotas existentes) ...
 
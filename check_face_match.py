@@ -0,0 +1,61 @@
+# check_face_match.py
+# Uso: python check_face_match.py
+# Confere a comparação vetorizada (galeria float16, GEMM em blocos) contra a
+# referência do face_recognition em galerias aleatórias, inclusive maiores que
+# FACE_MATCH_CHUNK
+import face_recognition
+import numpy as np
+
+from Rastro_app import (
+    FACE_MATCH_CHUNK,
+    FACE_MATCH_TOLERANCE,
+    KNOWN_FACES_DTYPE,
+    best_face_matches,
+    gallery_sq_norms
+)
+
+# Distâncias dos rostos plantados ao original: dentro e fora da tolerância,
+# com margem para o arredondamento do float16
+MATCH_DISTANCES = (0.2, FACE_MATCH_TOLERANCE - 0.05)
+NON_MATCH_DISTANCES = (FACE_MATCH_TOLERANCE + 0.05, 0.9)
+
+def make_probes(rng, gallery, count):
+    """Rostos a uma distância conhecida de linhas da galeria, mais rostos sem relação"""
+    rows = rng.integers(0, len(gallery), count)
+    directions = rng.normal(size=(count, 128))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    distances = np.where(
+        rng.random(count) < 0.5,
+        rng.uniform(*MATCH_DISTANCES, count),
+        rng.uniform(*NON_MATCH_DISTANCES, count)
+    )
+    planted = gallery[rows] + directions * distances[:, None]
+    unrelated = rng.normal(0, 0.09, (count, 128))
+    return np.vstack([planted, unrelated]), rows
+
+def check_gallery(rng, size, count=64):
+    gallery = rng.normal(0, 0.09, (size, 128)).astype(KNOWN_FACES_DTYPE)
+    known_matrix = np.ascontiguousarray(gallery)
+    # A referência usa os mesmos valores armazenados (float16) em float64
+    reference_gallery = gallery.astype(np.float64)
+
+    probes, rows = make_probes(rng, reference_gallery, count)
+    best, best_dists, matches = best_face_matches(probes, known_matrix, gallery_sq_norms(known_matrix))
+
+    for i, probe in enumerate(probes):
+        distances = face_recognition.face_distance(reference_gallery, probe)
+        compare = face_recognition.compare_faces(reference_gallery, probe, tolerance=FACE_MATCH_TOLERANCE)
+        expected = int(np.argmin(distances))
+
+        assert matches[i] == compare[expected], f"N={size}, rosto {i}: decisão diverge"
+        assert abs(best_dists[i] - distances[expected]) < 1e-3, f"N={size}, rosto {i}: distância diverge"
+        # Rostos plantados têm um único vizinho claro; nos sem relação pode
+        # haver empate dentro do erro de arredondamento
+        if i < count:
+            assert best[i] == expected == rows[i], f"N={size}, rosto {i}: índice diverge"
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    for size in (1, 257, FACE_MATCH_CHUNK, FACE_MATCH_CHUNK + 1000, 2 * FACE_MATCH_CHUNK + 7):
+        check_gallery(rng, size)
+        print(f"Galeria com {size} rostos: OK")
@@ -0,0 +1,11 @@
+# fit_pca.py
+# Uso: python fit_pca.py [corpus.txt]
+import sys
+
+from Rastro_app import PCA_CORPUS_PATH, PCA_MODEL_PATH, fit_entity_pca
+
+if __name__ == '__main__':
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else PCA_CORPUS_PATH
+    pca, agreement = fit_entity_pca(corpus_path)
+    print(f"Projeção PCA ({pca.n_components} componentes) gravada em {PCA_MODEL_PATH}")
+    print(f"Concordância dos clusters com e sem projeção (ARI): {agreement:.3f}")
@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+# Uso: gunicorn -c gunicorn.conf.py wsgi:app
+import os
+
+# Aplicar o monkey patch do gevent antes de a aplicação ser importada no mestre
+from gevent import monkey
+monkey.patch_all()
+
+# O Rastro_app verifica a CUDA ao ser importado, ainda no mestre; pela NVML a
+# verificação não inicializa o driver CUDA, que deixaria de funcionar nos
+# workers após o fork
+os.environ.setdefault('PYTORCH_NVML_BASED_CUDA_CHECK', '1')
+
+bind = os.getenv('RASTRO_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count()))
+worker_class = 'gevent'
+worker_connections = 1000
+timeout = 120
+
+# A aplicação (e os pesos dos modelos) é carregada uma vez no mestre e
+# compartilhada com os workers via copy-on-write
+preload_app = True
+
+# Dividir os núcleos entre os workers para evitar excesso de threads do torch
+os.environ.setdefault('TORCH_THREADS', str(max(1, os.cpu_count() // workers)))
@@ -0,0 +1,5 @@
+# wsgi.py
+from Rastro_app import app, load_models
+
+# Carregar os modelos antes do fork dos workers (preload_app no gunicorn.conf.py)
+load_models()